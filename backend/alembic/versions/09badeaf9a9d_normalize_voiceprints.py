@@ -0,0 +1,31 @@
+"""normalize voiceprints
+
+Revision ID: 09badeaf9a9d
+Revises: 84a4c4451d77
+Create Date: 2026-10-14 05:25:27.089151
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "09badeaf9a9d"
+down_revision: Union[str, Sequence[str], None] = "84a4c4451d77"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Verification now assumes unit-norm references, so rescale the enrolled ones in place.
+    op.execute(
+        'UPDATE "user" SET voiceprint = l2_normalize(voiceprint) WHERE voiceprint IS NOT NULL'
+    )
+    op.execute("UPDATE dummy_voiceprint SET voiceprint = l2_normalize(voiceprint)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # The original norms are not kept; unit-norm voiceprints remain valid for cosine scoring.
@@ -0,0 +1,43 @@
+"""store voiceprints as halfvec
+
+Revision ID: 881d6d957c6f
+Revises: 09badeaf9a9d
+Create Date: 2026-10-14 05:36:13.574213
+
+"""
+
+from typing import Sequence, Union
+
+import pgvector.sqlalchemy
+from alembic import op
+from app.core import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "881d6d957c6f"
+down_revision: Union[str, Sequence[str], None] = "09badeaf9a9d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DIM = settings.EMBEDDING_DIMENSION
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("user", "dummy_voiceprint"):
+        op.alter_column(
+            table,
+            "voiceprint",
+            type_=pgvector.sqlalchemy.HALFVEC(dim=DIM),
+            postgresql_using=f"voiceprint::halfvec({DIM})",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("user", "dummy_voiceprint"):
+        op.alter_column(
+            table,
+            "voiceprint",
+            type_=pgvector.sqlalchemy.VECTOR(dim=DIM),
+            postgresql_using=f"voiceprint::vector({DIM})",
+        )
@@ -1,14 +1,19 @@
+import hashlib
+import threading
+import time
 import uuid
 from typing import Annotated, AsyncGenerator
 
+import jwt
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, Request, Security, status
-from fastapi.security import OAuth2PasswordBearer, SecurityScopes
-from jose import JWTError, jwt
-from pydantic import ValidationError
+from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import crud
 from app.core import VoiceprintEngine, settings
+from app.core.security import JWT_ALGORITHM, JWT_SECRET
 from app.database import AsyncSessionLocal
 from app.database.models import User
 from app.schemas import TokenPayload
@@ -22,8 +27,14 @@ REUSABLE_OAUTH2 = OAuth2PasswordBearer(
     },
 )
 
+# Decoded tokens are cached by a digest of the raw token so repeated requests with the same
+# bearer skip signature verification; the TTL stays well below the shortest token lifetime.
+_JWT_CACHE: TTLCache[bytes, TokenPayload] = TTLCache(maxsize=4096, ttl=60)
+_JWT_CACHE_LOCK = threading.Lock()
+_JWT_ALGORITHMS = [JWT_ALGORITHM]
 
-async def get_db() -> AsyncGenerator[AsyncSession, None]:
+
+async def get_db_rw() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -35,6 +46,15 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+async def get_db_ro() -> AsyncGenerator[AsyncSession, None]:
+    """Yield a session for read-only handlers; no trailing COMMIT is issued."""
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
 def get_vpengine(request: Request) -> VoiceprintEngine:
     vpengine = getattr(request.app.state, "vpengine", None)
     if vpengine is None:
@@ -46,46 +66,73 @@ def get_vpengine(request: Request) -> VoiceprintEngine:
 
 
 VPEngineDep = Annotated[VoiceprintEngine, Depends(get_vpengine)]
-SessionDep = Annotated[AsyncSession, Depends(get_db)]
+# Function scope commits before the response is sent, so clients never observe a write that
+# has not landed yet (request-scoped teardown only runs after the response went out).
+SessionDep = Annotated[AsyncSession, Depends(get_db_rw, scope="function")]
+ReadOnlySessionDep = Annotated[AsyncSession, Depends(get_db_ro)]
 TokenDep = Annotated[str, Depends(REUSABLE_OAUTH2)]
 
 
 def parse_jwt_token(token: TokenDep) -> TokenPayload:
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _JWT_CACHE_LOCK:
+        cached = _JWT_CACHE.get(key)
+    if cached is not None and time.time() < cached.exp:
+        return cached
+
     try:
         payload = jwt.decode(
-            token, settings.JWT_SECRET_KEY.get_secret_value(), algorithms=[settings.JWT_ALGORITHM]
+            token,
+            JWT_SECRET,
+            algorithms=_JWT_ALGORITHMS,
+            options={"require": ["sub", "exp"]},
+        )
+        data = TokenPayload(
+            sub=payload["sub"], scopes=frozenset(payload["scopes"]), exp=payload["exp"]
         )
-        data = TokenPayload(**payload)
-    except (JWTError, ValidationError) as exc:
+    except (jwt.InvalidTokenError, KeyError, TypeError) as exc:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Could not verify credentials"
         ) from exc
+
+    with _JWT_CACHE_LOCK:
+        _JWT_CACHE[key] = data
     return data
 
 
 ParseJWTTokenDep = Annotated[TokenPayload, Depends(parse_jwt_token)]
 
 
-async def get_current_user(
-    security_scopes: SecurityScopes, session: SessionDep, payload: ParseJWTTokenDep
-) -> User:
-    authval = f"Bearer scope={security_scopes.scope_str}" if security_scopes.scopes else "Bearer"
-    for scope in security_scopes.scopes:
-        if scope not in payload.scopes:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Not enough permissions",
-                headers={"WWW-Authenticate": authval},
-            )
+async def _authorize_user(session: AsyncSession, payload: TokenPayload, scope: str) -> User:
+    if scope not in payload.scopes:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not enough permissions",
+            headers={"WWW-Authenticate": f"Bearer scope={scope}"},
+        )
 
-    user: User | None = await session.get(User, uuid.UUID(payload.sub))
+    user = await crud.get_user_by_id(session, uuid.UUID(payload.sub))
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return user
 
 
+# Each dependency hard-codes the scope it requires, so no SecurityScopes is built per request;
+# the scopes passed to Security() below are only used to document the OpenAPI schema.
+async def get_current_user(session: ReadOnlySessionDep, payload: ParseJWTTokenDep) -> User:
+    return await _authorize_user(session, payload, "auth:full")
+
+
+async def get_current_2fa_user(session: ReadOnlySessionDep, payload: ParseJWTTokenDep) -> User:
+    return await _authorize_user(session, payload, "2fa:required")
+
+
+async def get_current_enrollment_user(session: SessionDep, payload: ParseJWTTokenDep) -> User:
+    return await _authorize_user(session, payload, "onboarding:required")
+
+
 CurrentUserDep = Annotated[User, Security(get_current_user, scopes=["auth:full"])]
-Current2FAUserDep = Annotated[User, Security(get_current_user, scopes=["2fa:required"])]
+Current2FAUserDep = Annotated[User, Security(get_current_2fa_user, scopes=["2fa:required"])]
 CurrentEnrollmentUserDep = Annotated[
-    User, Security(get_current_user, scopes=["onboarding:required"])
+    User, Security(get_current_enrollment_user, scopes=["onboarding:required"])
 ]
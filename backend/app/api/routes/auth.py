@@ -3,15 +3,19 @@ from datetime import timedelta
 from typing import Annotated
 
 import numpy as np
-import torch
-import torchaudio
 from fastapi import Depends, HTTPException, UploadFile, status
 from fastapi.routing import APIRouter
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app import crud
-from app.api.deps import Current2FAUserDep, CurrentEnrollmentUserDep, SessionDep, VPEngineDep
-from app.core import create_token, settings
+from app.api.deps import (
+    Current2FAUserDep,
+    CurrentEnrollmentUserDep,
+    ReadOnlySessionDep,
+    SessionDep,
+    VPEngineDep,
+)
+from app.core import create_token, load_waveform, settings
 from app.schemas import Token, TokenWithPhrase, UserCreate
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -73,13 +77,12 @@ async def enroll_voice(
             detail=f"At least {settings.MIN_NUMBER_OF_ENROLLMENT_FILES} enrollment files are required",
         )
 
-    embeddings = []
-    for file in files:
-        waveform, sr = await asyncio.to_thread(torchaudio.load, file.file)
-        embedding = vpengine.embed(waveform, sr)
-        embeddings.append(embedding)
+    payloads = [await file.read() for file in files]
+    loaded = await asyncio.gather(*(asyncio.to_thread(load_waveform, data) for data in payloads))
+    waveforms, srs = zip(*loaded, strict=True)
+    embeddings = vpengine.embed_batch(list(waveforms), list(srs))
     aggregated = vpengine.aggregate(embeddings)
-    voiceprint = aggregated.detach().cpu().numpy().astype(np.float32)
+    voiceprint = aggregated.detach().cpu().numpy().astype(np.float32, copy=False)
     await crud.update_user_voiceprint(session, user, voiceprint)
 
     token = create_token(
@@ -97,7 +100,7 @@ async def enroll_voice(
     response_model=TokenWithPhrase,
 )
 async def login(
-    session: SessionDep, form: Annotated[OAuth2PasswordRequestForm, Depends()]
+    session: ReadOnlySessionDep, form: Annotated[OAuth2PasswordRequestForm, Depends()]
 ) -> TokenWithPhrase:
     user = await crud.authenticate_user(session, form.username, form.password)
     if user is None:
@@ -130,13 +133,18 @@ async def login(
     summary="Verify user's voice for authentication",
     response_model=Token,
 )
-async def verify_voice(file: UploadFile, user: Current2FAUserDep, vpengine: VPEngineDep) -> Token:
-    waveform, sr = await asyncio.to_thread(torchaudio.load, file.file)
+async def verify_voice(
+    file: UploadFile,
+    user: Current2FAUserDep,
+    session: ReadOnlySessionDep,
+    vpengine: VPEngineDep,
+) -> Token:
+    waveform, sr = await asyncio.to_thread(load_waveform, await file.read())
     embedding = vpengine.embed(waveform, sr)
-    reference = torch.from_numpy(user.voiceprint).to(device=vpengine.device)
+    probe = embedding.squeeze().detach().cpu().numpy().astype(np.float32, copy=False)
 
-    success, _ = vpengine.verify(embedding, reference)
-    if not success:
+    score = await crud.verify_voiceprint(session, user.id, probe)
+    if score is None or score < settings.VERIFICATION_THRESHOLD:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Voice verification failed",
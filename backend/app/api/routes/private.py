@@ -3,14 +3,12 @@ import logging
 from typing import Any
 
 import numpy as np
-import torch
-import torchaudio
 from fastapi import APIRouter, HTTPException, Response, UploadFile, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import select
 
-from app.api.deps import SessionDep, VPEngineDep
-from app.core import settings
+from app.api.deps import ReadOnlySessionDep, SessionDep, VPEngineDep
+from app.core import load_waveform, settings
 from app.database import DummyVoiceprint
 from app.schemas import VerifyResponse
 
@@ -26,11 +24,8 @@ logger = logging.getLogger(__name__)
 async def enroll(
     username: str, files: list[UploadFile], *, session: SessionDep, vpengine: VPEngineDep
 ) -> Response:
-    result = await session.execute(
-        select(DummyVoiceprint).where(DummyVoiceprint.username == username)
-    )
-    voiceprint = result.scalar_one_or_none()
-    if voiceprint is not None:
+    result = await session.execute(select(1).where(DummyVoiceprint.username == username).limit(1))
+    if result.scalar() is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Voiceprint for this user already exists",
@@ -41,14 +36,13 @@ async def enroll(
             detail=f"At least {settings.MIN_NUMBER_OF_ENROLLMENT_FILES} enrollment files are required",
         )
 
-    embeddings = []
-    for file in files:
-        waveform, sr = await asyncio.to_thread(torchaudio.load, file.file)
-        embedding = vpengine.embed(waveform, sr)
-        embeddings.append(embedding)
+    payloads = [await file.read() for file in files]
+    loaded = await asyncio.gather(*(asyncio.to_thread(load_waveform, data) for data in payloads))
+    waveforms, srs = zip(*loaded, strict=True)
+    embeddings = vpengine.embed_batch(list(waveforms), list(srs))
 
     aggregated = vpengine.aggregate(embeddings)
-    voiceprint = aggregated.detach().cpu().numpy().astype(np.float32)
+    voiceprint = aggregated.detach().cpu().numpy().astype(np.float32, copy=False)
     session.add(DummyVoiceprint(username=username, voiceprint=voiceprint))
     return Response(status_code=status.HTTP_201_CREATED)
 
@@ -62,10 +56,10 @@ async def enroll(
     },
 )
 async def verify(
-    username: str, file: UploadFile, *, session: SessionDep, vpengine: VPEngineDep
+    username: str, file: UploadFile, *, session: ReadOnlySessionDep, vpengine: VPEngineDep
 ) -> Any:
     result = await session.execute(
-        select(DummyVoiceprint).where(DummyVoiceprint.username == username)
+        select(DummyVoiceprint.voiceprint).where(DummyVoiceprint.username == username).limit(1)
     )
     voiceprint = result.scalar_one_or_none()
     if voiceprint is None:
@@ -74,9 +68,9 @@ async def verify(
             detail="Voiceprint for this user does not exist",
         )
 
-    waveform, sr = await asyncio.to_thread(torchaudio.load, file.file)
+    waveform, sr = await asyncio.to_thread(load_waveform, await file.read())
     embedding = vpengine.embed(waveform, sr)
-    reference = torch.from_numpy(voiceprint.voiceprint).to(device=vpengine.device)
+    reference = vpengine.reference(username, voiceprint)
     success, score = vpengine.verify(embedding, reference)
     logger.info("Voiceprint verification score for user '%s': %.4f", username, score)
 
@@ -84,5 +78,7 @@ async def verify(
         success=success, score=score, threshold=settings.VERIFICATION_THRESHOLD
     )
     if not success:
-        return JSONResponse(status_code=status.HTTP_401_UNAUTHORIZED, content=response.model_dump())
+        return ORJSONResponse(
+            status_code=status.HTTP_401_UNAUTHORIZED, content=response.model_dump()
+        )
     return response
@@ -3,6 +3,7 @@ from app.core.audio import (
     PeakNormalizationHandler,
     RMSNormalizationHandler,
     VADHandler,
+    load_waveform,
 )
 from app.core.engine import VoiceprintEngine
 from app.core.logger import LOGGING_CONFIG
@@ -17,6 +18,7 @@ __all__ = [
     "PeakNormalizationHandler",
     "RMSNormalizationHandler",
     "VADHandler",
+    "load_waveform",
     "create_token",
     "get_password_hash",
     "verify_password",
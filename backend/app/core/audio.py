@@ -1,8 +1,11 @@
+import io
 import logging
+import math
 from abc import ABC, abstractmethod
 from typing import Literal, Self, override
 
 import numpy as np
+import soundfile as sf
 import torch
 import torchaudio
 import webrtcvad
@@ -14,11 +17,25 @@ class AudioHandlerError(Exception):
     """Custom exception for audio handler errors."""
 
 
+def load_waveform(data: bytes) -> tuple[torch.Tensor, int]:
+    """Decode an in-memory audio file into a [channels, time] float32 waveform.
+
+    Uses libsndfile directly for the formats it understands (e.g. WAV, FLAC, OGG) and falls
+    back to torchaudio for anything else (e.g. MP3 or M4A).
+    """
+    try:
+        array, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except sf.LibsndfileError:
+        return torchaudio.load(io.BytesIO(data))
+    return torch.from_numpy(array.T), sr
+
+
 class EmbeddingAggregator(ABC):
     """Abstract base class for embedding aggregation strategies."""
 
     @abstractmethod
-    def aggregate(self, embeddings: list[torch.Tensor]) -> torch.Tensor:
+    def aggregate(self, embeddings: torch.Tensor) -> torch.Tensor:
+        """Reduce the [N, D] stacked embeddings into a single [D] embedding."""
         raise NotImplementedError
 
 
@@ -26,8 +43,8 @@ class MeanAggregator(EmbeddingAggregator):
     """Aggregates embeddings by computing their mean."""
 
     @override
-    def aggregate(self, embeddings: list[torch.Tensor]) -> torch.Tensor:
-        return torch.mean(torch.stack(embeddings), dim=0)
+    def aggregate(self, embeddings: torch.Tensor) -> torch.Tensor:
+        return embeddings.mean(dim=0)
 
 
 class SimpleSelfAttentionAggregator(EmbeddingAggregator):
@@ -45,10 +62,9 @@ class SimpleSelfAttentionAggregator(EmbeddingAggregator):
         ).to(device)
 
     @override
-    def aggregate(self, embeddings: list[torch.Tensor]) -> torch.Tensor:
-        stacked = torch.stack(embeddings)
-        weights = self._attention(stacked)
-        aggregated = torch.sum(weights * stacked, dim=0)
+    def aggregate(self, embeddings: torch.Tensor) -> torch.Tensor:
+        weights = self._attention(embeddings)
+        aggregated = torch.sum(weights * embeddings, dim=0)
         return aggregated
 
 
@@ -88,16 +104,31 @@ class ModelCompatHandler(AudioHandler):
 
     _TARGET_SR: int = 16000
 
+    def __init__(self) -> None:
+        super().__init__()
+        # Resample modules precompute their sinc kernel once, so keep one per source rate.
+        self._resamplers: dict[tuple[int, torch.dtype], torchaudio.transforms.Resample] = {}
+
+    def _resampler(self, sr: int, dtype: torch.dtype) -> torchaudio.transforms.Resample:
+        resampler = self._resamplers.get((sr, dtype))
+        if resampler is None:
+            resampler = torchaudio.transforms.Resample(sr, self._TARGET_SR, dtype=dtype)
+            self._resamplers[(sr, dtype)] = resampler
+        return resampler
+
     @override
     def process(self, waveform: torch.Tensor, sr: int) -> tuple[torch.Tensor, int]:
         if waveform.dtype not in (torch.float32, torch.float64):
             raise AudioHandlerError(
                 "ModelCompatHandler expects a waveform with float32 or float64 dtype"
             )
+        if sr == self._TARGET_SR and waveform.shape[0] == 1 and waveform.is_contiguous():
+            return waveform, sr
         if sr != self._TARGET_SR:
-            waveform = torchaudio.functional.resample(waveform, sr, self._TARGET_SR)
+            resampler = self._resampler(sr, waveform.dtype).to(waveform.device)
+            waveform = resampler(waveform)
         if waveform.shape[0] > 1:
-            waveform = torch.mean(waveform, dim=0, keepdim=True)
+            waveform = waveform.sum(dim=0, keepdim=True).mul_(1.0 / waveform.shape[0])
         return waveform, self._TARGET_SR
 
 
@@ -105,13 +136,14 @@ class PeakNormalizationHandler(AudioHandler):
     """Applies peak normalization to the audio waveform."""
 
     _TARGET_DB: float = -6.0
+    _TARGET_LINEAR: float = 10 ** (_TARGET_DB / 20)
 
     @override
     def process(self, waveform: torch.Tensor, sr: int) -> tuple[torch.Tensor, int]:
-        peak = waveform.abs().max()
+        # The infinity norm is max(|x|) computed in one pass without an abs() temporary.
+        peak = torch.linalg.vector_norm(waveform, ord=math.inf)
         if peak > 1e-6:
-            tp = 10 ** (self._TARGET_DB / 20)
-            waveform = waveform * (tp / peak)
+            waveform = waveform * (self._TARGET_LINEAR / peak)
         return waveform, sr
 
 
@@ -119,13 +151,14 @@ class RMSNormalizationHandler(AudioHandler):
     """Applies RMS normalization to the audio waveform."""
 
     _TARGET_DBFS: float = -20.0
+    _TARGET_LINEAR: float = 10 ** (_TARGET_DBFS / 20)
 
     @override
     def process(self, waveform: torch.Tensor, sr: int) -> tuple[torch.Tensor, int]:
-        rms = torch.sqrt(torch.mean(waveform**2))
+        # A single norm reduction instead of materializing waveform**2 and reducing it.
+        rms = torch.linalg.vector_norm(waveform) / math.sqrt(waveform.numel())
         if rms > 1e-6:
-            trms = 10 ** (self._TARGET_DBFS / 20)
-            waveform = waveform * (trms / rms)
+            waveform = waveform * (self._TARGET_LINEAR / rms)
         return waveform, sr
 
 
@@ -146,21 +179,34 @@ class VADHandler(AudioHandler):
         super().__init__()
         self._vad = webrtcvad.Vad(self._AGRESSIVENESS)
 
+    @staticmethod
+    def _dilate(voiced: np.ndarray, padding: int) -> np.ndarray:
+        """Mark every frame that has a voiced frame within `padding` frames on either side."""
+        if padding <= 0:
+            return voiced
+        csum = np.concatenate(([0], np.cumsum(voiced, dtype=np.int32)))
+        idx = np.arange(len(voiced))
+        upper = np.minimum(idx + padding + 1, len(voiced))
+        lower = np.maximum(idx - padding, 0)
+        return (csum[upper] - csum[lower]) > 0
+
     @override
     def process(self, waveform: torch.Tensor, sr: int) -> tuple[torch.Tensor, int]:
         wav1d = waveform.squeeze(0).cpu().numpy()
-        wavi16 = np.int16(wav1d * 32767)
         frame_len = int(sr * self._FRAME_DURATION_MS / 1000)
-        frames_num = int(np.ceil(len(wavi16) / frame_len))
-        padlen = frames_num * frame_len - len(wavi16)
-        if padlen > 0:
-            wavi16 = np.pad(wavi16, (0, padlen), mode="constant")
+        frames_num = int(np.ceil(len(wav1d) / frame_len))
+        # Quantize straight into a zero padded int16 buffer to avoid float temporaries.
+        wavi16 = np.zeros(frames_num * frame_len, dtype=np.int16)
+        np.multiply(wav1d, 32767, out=wavi16[: len(wav1d)], casting="unsafe")
 
         frames = wavi16.reshape(frames_num, frame_len)
+        buffer = memoryview(wavi16).cast("B")
+        frame_bytes = frame_len * wavi16.itemsize
         voiced = np.zeros(frames_num, dtype=bool)
-        for idx, frame in enumerate(frames):
+        for idx in range(frames_num):
             try:
-                voiced[idx] = self._vad.is_speech(frame.tobytes(), sr)
+                offset = idx * frame_bytes
+                voiced[idx] = self._vad.is_speech(buffer[offset : offset + frame_bytes], sr)
             except Exception:  # noqa
                 logger.warning("webrtcvad failed to process frame %d; marking as voiced", idx)
                 voiced[idx] = True
@@ -170,21 +216,16 @@ class VADHandler(AudioHandler):
             return waveform, sr
 
         padding_frames = max(0, int(self._SILENCE_PADDING_MS / self._FRAME_DURATION_MS))
-        if padding_frames > 0:
-            kernel = np.ones(2 * padding_frames + 1, dtype=int)
-            dilated = np.convolve(voiced.astype(int), kernel, mode="same") > 0
-        else:
-            dilated = voiced
+        dilated = self._dilate(voiced, padding_frames)
 
         selected = frames[dilated]
         if selected.size == 0:
             logger.debug("VAD detected no speech after padding; returning original waveform")
             return waveform, sr
 
-        speechi16 = selected.reshape(-1)
-        speechf32 = speechi16.astype(np.float32) / 32767.0
-        speech = np.clip(speechf32, -1.0, 1.0)
-        tensor = torch.from_numpy(speech).unsqueeze(0).to(torch.float32)
+        speech = np.divide(selected.reshape(-1), 32767.0, dtype=np.float32)
+        np.clip(speech, -1.0, 1.0, out=speech)
+        tensor = torch.from_numpy(speech).unsqueeze(0)
         logger.debug("VAD reduced audio from %.3fs to %.3fs", len(wav1d) / sr, tensor.shape[1] / sr)
 
         return tensor, sr
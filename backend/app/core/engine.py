@@ -1,7 +1,11 @@
+from collections.abc import Hashable
 from typing import Literal
 
+import numpy as np
 import torch
 import torch.nn.functional
+from cachetools import TTLCache
+from pgvector import HalfVector
 from speechbrain.inference.speaker import SpeakerRecognition
 
 from app.core.audio import (
@@ -14,14 +18,35 @@ from app.core.audio import (
 )
 from app.core.settings import settings
 
+# Settings are immutable after startup, so resolve the per-request ones once.
+_THRESHOLD: float = settings.VERIFICATION_THRESHOLD
+_INSTANCE_NORM: bool = settings.RECOGNIZER_MODEL == "xvect"
+
 
 class VoiceprintEngine:
+    # Reference voiceprints materialized on the engine device so verification skips the copy.
+    _REFERENCE_CACHE_SIZE: int = 10_000
+    _REFERENCE_CACHE_TTL: int = 60
+
     def __init__(
         self, recognizer: SpeakerRecognition, device: Literal["cpu", "cuda"] = "cpu"
     ) -> None:
         self._device = device
         recognizer.to(device=device)
+        recognizer.eval()
         self._recognizer = recognizer
+        if device == "cuda":
+            # Allow TF32 matmuls; cuDNN benchmarking stays off as input lengths vary per request.
+            torch.set_float32_matmul_precision("high")
+            torch.backends.cudnn.benchmark = False
+            # Compile the embedding model to fuse its kernels. The default mode is used because
+            # "reduce-overhead" records a CUDA graph per input length, and upload lengths vary.
+            recognizer.mods.embedding_model = torch.compile(
+                recognizer.mods.embedding_model, dynamic=True
+            )
+        self._references: TTLCache[Hashable, torch.Tensor] = TTLCache(
+            maxsize=self._REFERENCE_CACHE_SIZE, ttl=self._REFERENCE_CACHE_TTL
+        )
 
         pipeline = ModelCompatHandler()
         tail = pipeline
@@ -44,49 +69,124 @@ class VoiceprintEngine:
         """Get the device on which the engine (torch) is running."""
         return self._device
 
+    @torch.inference_mode()
+    def warmup(self, seconds: float = 3.0) -> None:
+        """Run a dummy forward pass so the first request does not pay the compilation cost."""
+        waveform = torch.zeros(1, int(16_000 * seconds), device=self._device)
+        self._encode(waveform)
+
+    def reference(self, key: Hashable, voiceprint: HalfVector | np.ndarray) -> torch.Tensor:
+        """Get the stored voiceprint as a tensor on the engine device, reused across requests."""
+        ref = self._references.get(key)
+        if ref is None:
+            if isinstance(voiceprint, HalfVector):
+                voiceprint = voiceprint.to_numpy()
+            ref = torch.from_numpy(np.ascontiguousarray(voiceprint, dtype=np.float32))
+            ref = self._to_device(ref)
+            self._references[key] = ref
+        return ref
+
+    def _to_device(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Move a CPU tensor to the engine device, staged in pinned memory on CUDA."""
+        if self._device == "cuda":
+            return tensor.pin_memory().to(device=self._device, non_blocking=True)
+        return tensor
+
     def _preprocess(self, waveform: torch.Tensor, sr: int) -> tuple[torch.Tensor, int]:
         """Preprocess the audio waveform using a chain of audio handlers."""
         return self._preprocessing_pipeline.handle(waveform, sr)
 
-    def embed(self, waveform: torch.Tensor, sr: int) -> torch.Tensor:
-        """Assemble the voiceprint embedding from the given waveform and sample rate.
-
-        Prepares the audio to match the ECAPA-TDNN model requirements and use additional
-        preprocessing handlers to refine the audio quality before extracting the embedding.
-        """
+    def _prepare(self, waveform: torch.Tensor, sr: int) -> torch.Tensor:
+        """Preprocess the waveform and reshape it to the [1, T] layout expected by the model."""
         waveform, _ = self._preprocess(waveform, sr)
         if waveform.dim() == 1:
             waveform = waveform.unsqueeze(0)
         if waveform.dim() > 2:
             waveform = waveform.mean(dim=0, keepdim=True)
+        return waveform
 
-        embedding = self._recognizer.encode_batch(waveform)
-        embedding = embedding.flatten()
-        if settings.RECOGNIZER_MODEL == "xvect":
+    @staticmethod
+    def _postprocess(embeddings: torch.Tensor) -> torch.Tensor:
+        """Apply model specific normalization along the last (embedding) dimension."""
+        if _INSTANCE_NORM:
             # Perform Instance Normalization for x-vector embeddings.
-            embedding = embedding - embedding.mean()
-            embedding = embedding / (embedding.std() + 1e-8)
-        return embedding
+            embeddings = embeddings - embeddings.mean(dim=-1, keepdim=True)
+            embeddings = embeddings / (embeddings.std(dim=-1, keepdim=True) + 1e-8)
+        return embeddings
+
+    def _encode(
+        self, waveforms: torch.Tensor, wav_lens: torch.Tensor | None = None
+    ) -> torch.Tensor:
+        """Run the recognizer forward pass, in bfloat16 autocast on CUDA, returning float32."""
+        with torch.autocast(
+            device_type=self._device, dtype=torch.bfloat16, enabled=self._device == "cuda"
+        ):
+            embeddings = self._recognizer.encode_batch(waveforms, wav_lens)
+        return embeddings.float()
+
+    @torch.inference_mode()
+    def embed(self, waveform: torch.Tensor, sr: int) -> torch.Tensor:
+        """Assemble the voiceprint embedding from the given waveform and sample rate.
+
+        Prepares the audio to match the ECAPA-TDNN model requirements and use additional
+        preprocessing handlers to refine the audio quality before extracting the embedding.
+        On CUDA the prepared waveform is staged in pinned memory and copied asynchronously.
+        """
+        waveform = self._to_device(self._prepare(waveform, sr))
+        embedding = self._encode(waveform)
+        return self._postprocess(embedding.flatten())
 
-    def aggregate(self, embeddings: list[torch.Tensor]) -> torch.Tensor:
-        """Aggregate multiple voiceprint embeddings into a single embedding."""
-        return self._aggregator.aggregate(embeddings)
+    @torch.inference_mode()
+    def embed_batch(self, waveforms: list[torch.Tensor], srs: list[int]) -> torch.Tensor:
+        """Assemble voiceprint embeddings for several waveforms, batching equal lengths.
+
+        Every waveform is preprocessed on its own, then waveforms of the same length share one
+        forward pass. Clips are never zero-padded: relative lengths do not fully mask padding
+        out (the filterbank and convolutions still see the zeros), so a short clip padded next
+        to a longer one would drift from what `embed` produces for it at verification. On CUDA every batch is staged
+        in pinned memory and copied asynchronously.
+
+        Returns:
+            A tensor of shape [B, D] with one embedding per input waveform, in input order.
+        """
+        prepared = [self._prepare(w, sr).squeeze(0) for w, sr in zip(waveforms, srs, strict=True)]
+        buckets: dict[int, list[int]] = {}
+        for idx, waveform in enumerate(prepared):
+            buckets.setdefault(waveform.shape[0], []).append(idx)
+
+        rows: list[torch.Tensor] = [torch.empty(0)] * len(prepared)
+        for indices in buckets.values():
+            batch = self._to_device(torch.stack([prepared[idx] for idx in indices]))
+            embeddings = self._encode(batch).reshape(len(indices), -1)
+            for row, idx in zip(embeddings, indices, strict=True):
+                rows[idx] = row
+        return self._postprocess(torch.stack(rows))
+
+    @torch.inference_mode()
+    def aggregate(self, embeddings: torch.Tensor | list[torch.Tensor]) -> torch.Tensor:
+        """Aggregate multiple voiceprint embeddings into a single L2-normalized embedding.
+
+        Accepts either the [N, D] output of `embed_batch` or a list of [D] embeddings.
+        """
+        if isinstance(embeddings, list):
+            embeddings = torch.stack(embeddings)
+        aggregated = self._aggregator.aggregate(embeddings)
+        return torch.nn.functional.normalize(aggregated, p=2, dim=0)
 
     @staticmethod
+    @torch.inference_mode()
     def verify(embedding: torch.Tensor, reference: torch.Tensor) -> tuple[bool, float]:
         """Verify if the given embedding matches the reference embedding.
 
         Uses cosine similarity to compare the two embeddings and determine if they
-        belong to the same speaker.
+        belong to the same speaker. The reference is expected to be L2-normalized already
+        (voiceprints are normalized by `aggregate` at enrollment), so only the probe
+        embedding is normalized before the dot product.
 
         Returns:
             A tuple containing a boolean indicating if the embeddings match and the
             similarity score as a float.
         """
-        emb = embedding.squeeze().float()
-        ref = reference.squeeze().float()
-
-        emb = torch.nn.functional.normalize(emb, p=2, dim=0)
-        ref = torch.nn.functional.normalize(ref, p=2, dim=0)
-        score = float(torch.dot(emb, ref).item())
-        return score >= settings.VERIFICATION_THRESHOLD, score
+        emb = torch.nn.functional.normalize(embedding.squeeze().float(), p=2, dim=0)
+        score = float(torch.dot(emb, reference.squeeze().float()).item())
+        return score >= _THRESHOLD, score
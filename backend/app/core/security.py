@@ -1,26 +1,40 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
-from jose import jwt
+import jwt
 from passlib.context import CryptContext
 
 from app.core.settings import settings
 
-PWD_CONTEXT = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Shared with token verification in `app.api.deps`, so signing and decoding cannot drift apart.
+JWT_SECRET = settings.JWT_SECRET_KEY.get_secret_value().encode()
+JWT_ALGORITHM = settings.JWT_ALGORITHM
+
+PWD_CONTEXT = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+# Hashing is CPU bound; a dedicated bounded pool keeps login bursts from starving the default
+# threadpool used for audio decoding, and keeps the event loop responsive.
+HASH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(os.cpu_count() or 1, 8), thread_name_prefix="password-hash"
+)
 
 
 def create_token(subject: str, name: str, delta: timedelta, scopes: list[str]) -> str:
     now = datetime.now(timezone.utc)
     expire = now + delta
     to_encode = {"exp": expire, "sub": subject, "name": name, "iat": now, "scopes": scopes}
-    encoded_jwt = jwt.encode(
-        to_encode, settings.JWT_SECRET_KEY.get_secret_value(), algorithm=settings.JWT_ALGORITHM
-    )
+    encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
 
-def verify_password(plan: str, hashed: str) -> bool:
-    return PWD_CONTEXT.verify(plan, hashed)
+async def verify_password(plan: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(HASH_EXECUTOR, PWD_CONTEXT.verify, plan, hashed)
 
 
-def get_password_hash(password: str) -> str:
-    return PWD_CONTEXT.hash(password)
+async def get_password_hash(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(HASH_EXECUTOR, PWD_CONTEXT.hash, password)
@@ -22,6 +22,7 @@ class Settings(BaseSettings):
     PRE_AUTH_TOKEN_EXPIRE_MINUTES: int = 5
     ENROLLMENT_TOKEN_EXPIRE_MINUTES: int = 15
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24
+    BCRYPT_ROUNDS: int = 12
 
     RECOGNIZER_MODEL: Literal["xvect", "ecapa"] = "ecapa"
     # Default embedding dimension is for ECAPA model; it will be adjusted automatically for x-vector.
@@ -38,6 +39,12 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str
     POSTGRES_DSN: PostgresDsn | None = None
+    # Connections allowed across all workers; each worker gets an equal share of the budget.
+    POSTGRES_MAX_CONNECTIONS: int = 60
+    # Number of worker processes sharing the connection budget (exported by scripts/start.sh).
+    WEB_CONCURRENCY: int = 1
+    # Connections every worker opens at startup; the rest of its pool is opened on demand.
+    POSTGRES_WARMUP_CONNECTIONS: int = 2
 
     @field_validator("BACKEND_CORS_ORIGINS", mode="before")
     @classmethod
@@ -1,19 +1,77 @@
+import asyncio
+import random
+import secrets
 import uuid
+import weakref
 
 import numpy as np
-from sqlalchemy import func, select
+from cachetools import TTLCache
+from sqlalchemy import event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer
 
 from app.core import get_password_hash, verify_password
+from app.core.security import PWD_CONTEXT
 from app.database.models import Phrase, User
 from app.schemas import UserCreate
 
+# Short-lived snapshots of users resolved by id, so authenticated requests can skip the SELECT.
+# Writers call `invalidate_cached_user`, which drops the entry again once the write commits.
+# The cache is per process: other workers keep serving their snapshot for up to the TTL, so
+# the TTL is kept to a few seconds.
+_USER_CACHE: TTLCache[uuid.UUID, User] = TTLCache(maxsize=10_000, ttl=5)
+_PENDING_INVALIDATIONS = "invalidated_user_ids"
+_USER_LOCKS: weakref.WeakValueDictionary[uuid.UUID, asyncio.Lock] = weakref.WeakValueDictionary()
+# Verified against when the email is unknown, so both login failure paths cost one bcrypt check.
+_DUMMY_HASH = PWD_CONTEXT.hash(secrets.token_urlsafe(16))
+# Phrase count used to pick a random offset; phrases are seeded rarely, so a stale value is fine.
+_PHRASE_COUNT: TTLCache[str, int] = TTLCache(maxsize=1, ttl=300)
+
+
+# The voiceprint is only scored in SQL (see `verify_voiceprint`), so user loads never transfer
+# and decode it with the row.
+_DEFER_VOICEPRINT = defer(User.voiceprint)
+
 
 async def get_user_by_email(session: AsyncSession, email: str) -> User | None:
-    result = await session.execute(select(User).where(User.email == email))
+    result = await session.execute(
+        select(User).where(User.email == email).options(_DEFER_VOICEPRINT)
+    )
     return result.scalar_one_or_none()
 
 
+async def get_user_by_id(session: AsyncSession, user_id: uuid.UUID) -> User | None:
+    cached = _USER_CACHE.get(user_id)
+    if cached is not None:
+        return await session.merge(cached, load=False)
+
+    lock = _USER_LOCKS.setdefault(user_id, asyncio.Lock())
+    async with lock:
+        cached = _USER_CACHE.get(user_id)
+        if cached is not None:
+            return await session.merge(cached, load=False)
+        user = await session.get(User, user_id, options=[_DEFER_VOICEPRINT])
+        if user is not None:
+            _USER_CACHE[user_id] = user
+    return user
+
+
+def invalidate_cached_user(session: AsyncSession, user_id: uuid.UUID) -> None:
+    """Drop the cached user now and once more after the session commits.
+
+    A lookup that misses the cache before the commit reloads the old row, so the entry is
+    also popped after the commit to avoid serving it for the rest of the TTL.
+    """
+    _USER_CACHE.pop(user_id, None)
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_INVALIDATIONS, ()):
+        _USER_CACHE.pop(user_id, None)
+
+
 async def create_user_with_phrase(
     session: AsyncSession, user_in: UserCreate, phrase_id: uuid.UUID
 ) -> User:
@@ -22,59 +80,105 @@ async def create_user_with_phrase(
         surname=user_in.surname,
         email=str(user_in.email),
         username=user_in.username,
-        password=get_password_hash(user_in.password),
+        password=await get_password_hash(user_in.password),
         phrase_id=phrase_id,
         is_enrollment_complete=False,
         voiceprint=None,
     )
     session.add(user)
     await session.flush()
-    await session.refresh(user)
     return user
 
 
 async def reset_incomplete_enrollment_user(
     session: AsyncSession, user: User, user_in: UserCreate, phrase_id: uuid.UUID
 ) -> User:
+    invalidate_cached_user(session, user.id)
     user.name = user_in.name
     user.surname = user_in.surname
     user.email = str(user_in.email)
     user.username = user_in.username
-    user.password = get_password_hash(user_in.password)
+    user.password = await get_password_hash(user_in.password)
     user.phrase_id = phrase_id
     user.is_enrollment_complete = False
     user.voiceprint = None
 
     await session.flush()
-    await session.refresh(user)
     return user
 
 
+def _unit(embedding: np.ndarray) -> np.ndarray:
+    embedding = np.asarray(embedding, dtype=np.float32)
+    return embedding / (np.linalg.norm(embedding) + 1e-12)
+
+
 async def update_user_voiceprint(session: AsyncSession, user: User, embedding: np.ndarray) -> User:
-    user.voiceprint = embedding
+    invalidate_cached_user(session, user.id)
+    user.voiceprint = _unit(embedding)
     user.is_enrollment_complete = True
     await session.flush()
-    await session.refresh(user)
     return user
 
 
 async def authenticate_user(session: AsyncSession, email: str, password: str) -> User | None:
+    # Credentials and the enrollment flag are always checked against a fresh row, since cached
+    # snapshots may lag behind writes made by other workers.
     user = await get_user_by_email(session, email)
-    if user is not None:
-        mismatch = not verify_password(password, user.password)
-        if mismatch:
-            user = None
+    if user is None:
+        await verify_password(password, _DUMMY_HASH)
+        return None
+    mismatch = not await verify_password(password, user.password)
+    if mismatch:
+        return None
+    # Seed the id cache from the fresh row, so requests right after the login skip the SELECT.
+    _USER_CACHE[user.id] = user
     return user
 
 
+async def verify_voiceprint(
+    session: AsyncSession, user_id: uuid.UUID, embedding: np.ndarray
+) -> float | None:
+    """Score the embedding against the user's stored voiceprint inside Postgres.
+
+    Stored voiceprints are unit-norm, so once the probe is normalized the inner product
+    is the cosine similarity and the server skips computing both norms.
+
+    Returns the cosine similarity, or None if the user has no voiceprint enrolled.
+    """
+    # pgvector's <#> operator yields the negated inner product.
+    neg_ip = User.voiceprint.max_inner_product(_unit(embedding))
+    result = await session.execute(select(neg_ip).where(User.id == user_id))
+    value = result.scalar_one_or_none()
+    return None if value is None else -float(value)
+
+
+async def _count_phrases(session: AsyncSession) -> int:
+    count = _PHRASE_COUNT.get("phrase")
+    if count is None:
+        count = await session.scalar(select(func.count(Phrase.id))) or 0
+        if count:
+            _PHRASE_COUNT["phrase"] = count
+    return count
+
+
 async def get_random_phrase(session: AsyncSession) -> Phrase | None:
-    result = await session.execute(select(Phrase).order_by(func.random()).limit(1))
-    return result.scalar_one_or_none()
+    for _ in range(2):
+        count = await _count_phrases(session)
+        if count == 0:
+            return None
+        offset = random.randrange(count)
+        result = await session.execute(select(Phrase).offset(offset).limit(1))
+        phrase = result.scalar_one_or_none()
+        if phrase is not None:
+            return phrase
+        # The cached count outlived deleted phrases; recount and try once more.
+        _PHRASE_COUNT.clear()
+    return None
 
 
 async def create_phrase(session: AsyncSession, content: str) -> Phrase:
     phrase = Phrase(content=content)
     session.add(phrase)
     await session.flush()
-    await session.refresh(phrase)
+    _PHRASE_COUNT.clear()
     return phrase
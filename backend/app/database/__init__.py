@@ -1,4 +1,12 @@
-from app.database.conn import AsyncSessionLocal
+from app.database.conn import AsyncSessionLocal, engine, warmup_pool
 from app.database.models import Base, DummyVoiceprint, Phrase, User
 
-__all__ = ["Base", "User", "Phrase", "AsyncSessionLocal", "DummyVoiceprint"]
+__all__ = [
+    "Base",
+    "User",
+    "Phrase",
+    "AsyncSessionLocal",
+    "DummyVoiceprint",
+    "engine",
+    "warmup_pool",
+]
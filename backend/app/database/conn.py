@@ -1,8 +1,32 @@
+from contextlib import AsyncExitStack
+
+from pgvector.asyncpg import register_vector
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core import settings
 
-engine = create_async_engine(str(settings.POSTGRES_DSN))
+# Every worker has its own pool, so the budget is split between them to keep the total below
+# the server's max_connections; half of a worker's share is kept open, the rest is overflow.
+_WORKER_CONNECTIONS = max(2, settings.POSTGRES_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+POOL_SIZE = _WORKER_CONNECTIONS // 2
+
+engine = create_async_engine(
+    str(settings.POSTGRES_DSN),
+    pool_size=POOL_SIZE,
+    max_overflow=_WORKER_CONNECTIONS - POOL_SIZE,
+    # Connections are recycled before server-side idle timeouts, so skip the ping per checkout.
+    pool_pre_ping=False,
+    pool_recycle=1800,
+    connect_args={"statement_cache_size": 1024, "prepared_statement_cache_size": 256},
+)
+
+
+@event.listens_for(engine.sync_engine, "connect")
+def _register_vector_codecs(dbapi_connection, connection_record) -> None:
+    """Exchange pgvector values in their binary format instead of the text representation."""
+    dbapi_connection.run_async(register_vector)
+
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -11,3 +35,10 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
     class_=AsyncSession,
 )
+
+
+async def warmup_pool() -> None:
+    """Open (and release) a few pooled connections so first requests skip the connect."""
+    async with AsyncExitStack() as stack:
+        for _ in range(min(settings.POSTGRES_WARMUP_CONNECTIONS, POOL_SIZE)):
+            await stack.enter_async_context(engine.connect())
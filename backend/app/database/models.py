@@ -1,8 +1,9 @@
+import os
 import re
+import time
 import uuid
 
-import numpy as np
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import HALFVEC, HalfVector
 from sqlalchemy import ForeignKey, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, validates
@@ -13,21 +14,46 @@ EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,6}$")
 USERNAME_RE = re.compile(r"^\w{4,}$")
 
 
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUIDv7 (RFC 9562) so primary key inserts append to the index."""
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10))
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+class BinaryHalfVec(HALFVEC):
+    """HALFVEC bound as `HalfVector` objects for the binary asyncpg codec registered on connect."""
+
+    cache_ok = True
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None or isinstance(value, HalfVector):
+                return value
+            value = HalfVector(value)
+            if self.dim is not None and value.dimensions() != self.dim:
+                raise ValueError(f"expected {self.dim} dimensions, not {value.dimensions()}")
+            return value
+
+        return process
+
+
 class Base(DeclarativeBase): ...
 
 
 class User(Base):
     __tablename__: str = "user"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     surname: Mapped[str] = mapped_column(String(100), nullable=False)
     email: Mapped[str] = mapped_column(String(255), index=True, unique=True, nullable=False)
     username: Mapped[str] = mapped_column(String(50), nullable=False)
     password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_enrollment_complete: Mapped[bool] = mapped_column(nullable=False, default=False)
-    voiceprint: Mapped[np.ndarray | None] = mapped_column(
-        Vector(settings.EMBEDDING_DIMENSION), nullable=True
+    voiceprint: Mapped[HalfVector | None] = mapped_column(
+        BinaryHalfVec(settings.EMBEDDING_DIMENSION), nullable=True
     )
     phrase_id: Mapped[uuid.UUID | None] = mapped_column(ForeignKey("phrase.id"), nullable=True)
 
@@ -49,7 +75,7 @@ class User(Base):
 class Phrase(Base):
     __tablename__: str = "phrase"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     content: Mapped[str] = mapped_column(String(2048), nullable=False, unique=True)
 
 
@@ -58,6 +84,6 @@ class DummyVoiceprint(Base):
 
     __tablename__: str = "dummy_voiceprint"
 
-    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     username: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
-    voiceprint: Mapped[np.ndarray] = mapped_column(Vector(settings.EMBEDDING_DIMENSION))
+    voiceprint: Mapped[HalfVector] = mapped_column(BinaryHalfVec(settings.EMBEDDING_DIMENSION))
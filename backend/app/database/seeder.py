@@ -1,7 +1,7 @@
 import asyncio
 import logging
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 
 from app.database.conn import AsyncSessionLocal
 from app.database.models import Phrase
@@ -22,18 +22,17 @@ PHRASES_CONTENT = [
 async def init() -> None:
     async with AsyncSessionLocal() as session:
         try:
-            result = await session.execute(select(Phrase).limit(1))
-            first = result.scalar_one_or_none()
-            if first is not None:
-                logger.info("Phrases already initialized, skipping...")
-                return
-
-            logger.info("Initializing phrases...")
-            for content in PHRASES_CONTENT:
-                phrase = Phrase(content=content)
-                session.add(phrase)
-
-            await session.commit()
+            async with session.begin():
+                result = await session.execute(select(Phrase).limit(1))
+                first = result.scalar_one_or_none()
+                if first is not None:
+                    logger.info("Phrases already initialized, skipping...")
+                    return
+
+                logger.info("Initializing phrases...")
+                await session.execute(
+                    insert(Phrase), [{"content": content} for content in PHRASES_CONTENT]
+                )
             logger.info("Phrases initialized. Added %d phrases.", len(PHRASES_CONTENT))
         except Exception as exc:
             logger.error("Failed to initialize phrases: %s", exc)
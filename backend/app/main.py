@@ -5,32 +5,38 @@ from typing import AsyncGenerator, Literal
 
 import torch
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from speechbrain.inference.speaker import SpeakerRecognition
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api import router
 from app.core import LOGGING_CONFIG, VoiceprintEngine, settings
+from app.database import engine, warmup_pool
 
 logging.config.dictConfig(LOGGING_CONFIG)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator:
+    await warmup_pool()
     device: Literal["cpu", "cuda"] = "cuda" if torch.cuda.is_available() else "cpu"
     recognizer = SpeakerRecognition.from_hparams(
         source=f"speechbrain/spkrec-{settings.RECOGNIZER_MODEL}-voxceleb",
         run_opts={"device": device},
     )
     vpengine = VoiceprintEngine(recognizer=recognizer, device=device)
+    vpengine.warmup()
     app.state.vpengine = vpengine  # type: ignore[attr-defined]
     yield
     del app.state.vpengine  # type: ignore[attr-defined]
     if device == "cuda":
         torch.cuda.empty_cache()
+    await engine.dispose()
 
 
 app = FastAPI(
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     title="voiceprint-app",
     version=importlib.metadata.version("app"),
     openapi_url=f"{settings.API_PATH}/openapi.json",
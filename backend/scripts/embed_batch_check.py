@@ -0,0 +1,73 @@
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import torch
+from app.core import VoiceprintEngine, load_waveform, settings
+from speechbrain.inference.speaker import SpeakerRecognition
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s] %(levelname)s: %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+logger = logging.getLogger(__name__)
+
+
+def compare(vpengine: VoiceprintEngine, files: list[Path]) -> tuple[float, float]:
+    """Embed the files with `embed_batch` and one by one with `embed`.
+
+    Returns:
+        The maximum absolute difference and the minimum cosine similarity between the
+        batched and the single embedding of the same file.
+    """
+    loaded = [load_waveform(file.read_bytes()) for file in files]
+    waveforms, srs = zip(*loaded, strict=True)
+    batched = vpengine.embed_batch(list(waveforms), list(srs))
+    single = torch.stack([vpengine.embed(w, sr) for w, sr in loaded])
+
+    max_abs = float((batched - single).abs().max())
+    min_cos = float(torch.nn.functional.cosine_similarity(batched, single, dim=-1).min())
+    return max_abs, min_cos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check that batched enrollment embeddings match single-clip embeddings."
+    )
+    parser.add_argument(
+        "--recordings", required=True, type=Path, help="Directory with .wav files to embed."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=1e-4,
+        help="Maximum allowed absolute difference between batched and single embeddings.",
+    )
+    args = parser.parse_args()
+
+    files = sorted(args.recordings.glob("*.wav"))
+    if not files:
+        raise ValueError("No .wav files found in the recordings directory")
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    recognizer = SpeakerRecognition.from_hparams(
+        source=f"speechbrain/spkrec-{settings.RECOGNIZER_MODEL}-voxceleb",
+        run_opts={"device": device},
+    )
+    vpengine = VoiceprintEngine(recognizer=recognizer, device=device)
+
+    max_abs, min_cos = compare(vpengine, files)
+    logger.info(
+        "Compared %d files: max abs diff %.2e, min cosine %.6f", len(files), max_abs, min_cos
+    )
+    if max_abs > args.tolerance:
+        logger.error("Batched embeddings diverge from single embeddings")
+        sys.exit(1)
+    logger.info("Batched and single embeddings match")
+
+
+if __name__ == "__main__":
+    main()
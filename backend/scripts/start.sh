@@ -15,7 +15,16 @@ echo "Running database seeder..."
 python -m app.database.seeder
 
 if [ "$APP_ENV" == "production" ]; then
-  exec fastapi run --host 0.0.0.0 --workers 4 app/main.py
+  # Every worker loads its own copy of the recognizer; on a GPU a single worker keeps one
+  # model and CUDA context and serves concurrent requests from its event loop instead.
+  if python -c "import sys, torch; sys.exit(0 if torch.cuda.is_available() else 1)"; then
+    WORKERS=1
+  else
+    WORKERS=${WEB_CONCURRENCY:-4}
+  fi
+  # The app splits POSTGRES_MAX_CONNECTIONS between this many workers.
+  export WEB_CONCURRENCY="$WORKERS"
+  exec fastapi run --host 0.0.0.0 --workers "$WORKERS" app/main.py
 else
   exec fastapi dev --host 0.0.0.0 app/main.py
 fi
\ No newline at end of file
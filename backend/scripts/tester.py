@@ -1,17 +1,19 @@
 import argparse
 import asyncio
+import functools
 import logging
 import re
 import sys
 import uuid
 from collections import defaultdict
+from dataclasses import dataclass, field
 from http import HTTPStatus
 from pathlib import Path
 from typing import Literal, Self, cast
 
 import httpx
 import numpy as np
-from pydantic import BaseModel, Field, RootModel
+import orjson
 from tabulate import tabulate
 
 logging.basicConfig(
@@ -29,25 +31,50 @@ FILENAME_PATTERN = re.compile(
 )
 
 
-class Scenario(BaseModel):
+@functools.lru_cache(maxsize=None)
+def _read_bytes(path: Path) -> bytes:
+    # Every probe is sent to many targets and folds; read each recording from disk only once.
+    return path.read_bytes()
+
+
+@dataclass(slots=True, frozen=True)
+class Scenario:
     name: str
     duration: Literal["short", "long"]
     enrollments: int
 
 
-class RecordingMetadata(BaseModel):
-    id: int | None = None
+@dataclass(slots=True, frozen=True)
+class RecordingMetadata:
     type: Literal["enrollment", "verification", "spoof", "sick"]
     duration: Literal["short", "long"]
+    id: int | None = None
 
 
-class Recording(BaseModel):
+@dataclass(slots=True, frozen=True)
+class Recording:
     file: Path
     metadata: RecordingMetadata
 
 
-class UserRecordings(RootModel):
+@dataclass(slots=True)
+class UserRecordings:
     root: list[Recording]
+    # Files bucketed by (duration, type) and verification pools by duration, built once so
+    # lookups do not rescan every recording.
+    _by_key: dict[tuple[str, str], list[Path]] = field(init=False, repr=False)
+    _pools: dict[str, list[Path]] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._by_key = defaultdict(list)
+        for rec in self.root:
+            self._by_key[(rec.metadata.duration, rec.metadata.type)].append(rec.file)
+        self._pools = {}
+        for duration in {rec.metadata.duration for rec in self.root}:
+            pool = self._by_key.get((duration, "enrollment"), []) + self._by_key.get(
+                (duration, "verification"), []
+            )
+            self._pools[duration] = sorted(set(pool))
 
     def __iter__(self):
         return iter(self.root)
@@ -56,30 +83,27 @@ class UserRecordings(RootModel):
         return self.root[item]
 
     def filter(self, duration: str, type: str) -> list[Path]:
-        return [
-            rec.file
-            for rec in self.root
-            if rec.metadata.duration == duration and rec.metadata.type == type
-        ]
+        return self._by_key.get((duration, type), [])
 
     def get_verification_pool(self, duration: str) -> list[Path]:
-        pool = [
-            rec.file
-            for rec in self.root
-            if rec.metadata.duration == duration
-            and rec.metadata.type in ("enrollment", "verification")
-        ]
-        return sorted(set(pool))
+        return self._pools.get(duration, [])
 
     @classmethod
     def from_paths(cls, paths: list[Path]) -> Self:
-        recordings = []
+        matched = []
         for filename in paths:
             match = FILENAME_PATTERN.match(filename.name)
             if not match:
                 logger.warning("Filename does not match pattern, skipping: %s", filename)
                 continue
+            matched.append((filename, match))
+        return cls.from_matched(matched)
 
+    @classmethod
+    def from_matched(cls, matched: list[tuple[Path, re.Match[str]]]) -> Self:
+        """Build recordings from paths already matched against `FILENAME_PATTERN`."""
+        recordings = []
+        for filename, match in matched:
             groups = match.groupdict()
             rectype = "enrollment" if groups["maintype"] == "enr" else "verification"
             if groups.get("subtype") == "sick":
@@ -89,20 +113,24 @@ class UserRecordings(RootModel):
             metadata = RecordingMetadata(
                 id=int(groups["idx"]) if groups.get("idx") else None,
                 type=cast(Literal["enrollment", "verification", "spoof", "sick"], rectype),
-                duration=groups["dur"],
+                duration=cast(Literal["short", "long"], groups["dur"]),
             )
             recordings.append(Recording(file=filename, metadata=metadata))
         return cls(root=recordings)
 
 
-class UserGroup(BaseModel):
-    id: uuid.UUID = Field(default_factory=uuid.uuid4)
+@dataclass(slots=True)
+class UserGroup:
     username: str
     recordings: UserRecordings
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
 
 
-class ResearchResult(BaseModel):
+@dataclass(slots=True, frozen=True)
+class ResearchResult:
     user: str
+    # Username of the recording's speaker, i.e. the part of `probe` before the test type.
+    speaker: str
     probe: str
     scenario: str
     duration: str
@@ -111,42 +139,61 @@ class ResearchResult(BaseModel):
     score: float
 
 
-class BatchResults(RootModel):
+@dataclass(slots=True)
+class BatchResults:
     root: list[ResearchResult]
 
-    def summary(self, threshold: float = 0.7) -> None:
+    def to_array(self) -> np.recarray:
+        """Return the results as a structured array with one column per `ResearchResult` field."""
+        return np.rec.fromarrays(
+            [
+                [r.user for r in self.root],
+                [r.speaker for r in self.root],
+                [r.scenario for r in self.root],
+                [r.type for r in self.root],
+                np.fromiter((r.score for r in self.root), dtype=np.float64, count=len(self.root)),
+            ],
+            names=["user", "speaker", "scenario", "type", "score"],
+        )
+
+    def summary(self, threshold: float = 0.7, tablefmt: str = "simple") -> None:
         if not self.root:
             logger.warning("No results to summarize")
             return
+        # Everything below only feeds INFO logs, including the N x N matrix stringification.
+        if not logger.isEnabledFor(logging.INFO):
+            return
 
-        grouped = defaultdict(list)
-        for result in self.root:
-            grouped[result.scenario].append(result)
+        # Columnar view of the results, built once so every metric and matrix below is a masked
+        # NumPy reduction instead of another walk over the result objects.
+        table = self.to_array()
+        scores, types, scenarios = table.score, table.type, table.scenario
 
         data = []
         logger.info("Summary of results (threshold: %.2f):", threshold)
 
-        for scenario, results in sorted(grouped.items()):
-            aut_scores = [r.score for r in results if r.type == "verification"]
-            imp_scores = [r.score for r in results if r.type == "imposter"]
-            sick_scores = [r.score for r in results if r.type == "sick"]
-            spoof_scores = [r.score for r in results if r.type == "spoof"]
+        for scenario in np.unique(scenarios):
+            in_scenario = scenarios == scenario
+            aut_scores = scores[in_scenario & (types == "verification")]
+            imp_scores = scores[in_scenario & (types == "imposter")]
+            sick_scores = scores[in_scenario & (types == "sick")]
+            spoof_scores = scores[in_scenario & (types == "spoof")]
 
             data.append([f"SCENARIO: {scenario}", "", "", ""])
 
-            frr = np.mean([s < threshold for s in aut_scores])
+            frr = np.mean(aut_scores < threshold)
             avg_aut = np.mean(aut_scores)
             data.append(["  > verification", f"{avg_aut:.4f}", f"{frr:.1%}", "FRR"])
 
-            far = np.mean([s >= threshold for s in imp_scores])
+            far = np.mean(imp_scores >= threshold)
             avg_imp = np.mean(imp_scores)
             data.append(["  > imposter", f"{avg_imp:.4f}", f"{far:.1%}", "FAR"])
 
-            sick_acc = np.mean([s >= threshold for s in sick_scores])
+            sick_acc = np.mean(sick_scores >= threshold)
             avg_sick = np.mean(sick_scores)
             data.append(["  > sick", f"{avg_sick:.4f}", f"{sick_acc:.1%}", "SICK ACCEPT RATE"])
 
-            spoof_acc = np.mean([s >= threshold for s in spoof_scores])
+            spoof_acc = np.mean(spoof_scores >= threshold)
             avg_spoof = np.mean(spoof_scores)
             data.append(
                 ["  > spoofing", f"{avg_spoof:.4f}", f"{spoof_acc:.1%}", "SPOOFING ACCEPT RATE"]
@@ -155,35 +202,31 @@ class BatchResults(RootModel):
         output = tabulate(
             data,
             headers=["SCENARIO / TEST TYPE", "AVG SCORE", "RATE [%]", "METRIC DESC"],
-            tablefmt="fancy_grid",
+            tablefmt=tablefmt,
             colalign=("left", "right", "right"),
         )
         logger.info("\n%s", output)
         logger.info("Total tests performed: %d", len(self.root))
-        self._similarity_matrix()
-        self._imposter_stats_matrix()
+        self._similarity_matrix(table)
+        self._imposter_stats_matrix(table)
 
-    def _similarity_matrix(self) -> None:
+    @staticmethod
+    def _similarity_matrix(table: np.recarray) -> None:
         logger.info("Similarity matrix (cross-score analysis):")
-        scenarios = {r.scenario for r in self.root}
-        for sc in sorted(scenarios):
-            results = [
-                r for r in self.root if r.scenario == sc and r.type in ("verification", "imposter")
-            ]
+        cross = np.isin(table.type, ("verification", "imposter"))
+        for sc in np.unique(table.scenario):
+            results = table[(table.scenario == sc) & cross]
 
-            targets = sorted({r.user for r in results})
-            probes = sorted({r.probe.split("_")[0] for r in results})
-            tidx = {name: i for i, name in enumerate(targets)}
-            pidx = {name: i for i, name in enumerate(probes)}
+            # Sorted unique labels plus, per result, the row/column index it falls into.
+            targets, ridx = np.unique(results.user, return_inverse=True)
+            probes, cidx = np.unique(results.speaker, return_inverse=True)
+            scores = results.score
 
             n_rows, n_cols = len(targets), len(probes)
             matrix_sums = np.zeros((n_rows, n_cols))
             matrix_counts = np.zeros((n_rows, n_cols))
-            for result in results:
-                ridx = tidx[result.user]
-                cidx = pidx[result.probe.split("_")[0]]
-                matrix_sums[ridx, cidx] += result.score
-                matrix_counts[ridx, cidx] += 1
+            np.add.at(matrix_sums, (ridx, cidx), scores)
+            np.add.at(matrix_counts, (ridx, cidx), 1)
 
             matrix_avgs = np.divide(
                 matrix_sums, matrix_counts, out=np.zeros_like(matrix_sums), where=matrix_counts != 0
@@ -197,37 +240,40 @@ class BatchResults(RootModel):
                 data.append(row)
 
             headers = ["TARGET / INPUT"] + [p.upper() for p in probes]
-            output = tabulate(data, headers=headers, tablefmt="fancy_grid")
+            # These tables grow as N users x N probes, so skip the box drawing regardless of the
+            # summary format.
+            output = tabulate(data, headers=headers, tablefmt="simple")
             logger.info("\n%s", output)
             logger.info("Total comparisons: %d", len(results))
 
-    def _imposter_stats_matrix(self) -> None:
+    @staticmethod
+    def _imposter_stats_matrix(table: np.recarray) -> None:
         logger.info("Imposter min/max matrix (score range analysis):")
-        scenarios = {r.scenario for r in self.root}
-        for sc in scenarios:
-            results = [r for r in self.root if r.scenario == sc and r.type == "imposter"]
+        for sc in np.unique(table.scenario):
+            results = table[(table.scenario == sc) & (table.type == "imposter")]
 
-            targets = sorted({r.user for r in results})
-            probes = sorted({r.probe.split("_")[0] for r in results})
+            targets, ridx = np.unique(results.user, return_inverse=True)
+            probes, cidx = np.unique(results.speaker, return_inverse=True)
+            scores = results.score
 
-            mapping = defaultdict(lambda: defaultdict(list))
-            for result in results:
-                probe = result.probe.split("_")[0]
-                mapping[result.user][probe].append(result.score)
+            shape = (len(targets), len(probes))
+            matrix_mins = np.full(shape, np.inf)
+            matrix_maxs = np.full(shape, -np.inf)
+            np.minimum.at(matrix_mins, (ridx, cidx), scores)
+            np.maximum.at(matrix_maxs, (ridx, cidx), scores)
 
             data = []
-            for target in targets:
+            for i, target in enumerate(targets):
                 row = [target.upper()]
-                for probe in probes:
-                    if target == probe:
+                for j in range(len(probes)):
+                    if np.isinf(matrix_mins[i, j]):
                         row.append("-")
                         continue
-                    scores = mapping[target][probe]
-                    row.append(f"{min(scores):.4f} / {max(scores):.4f}")
+                    row.append(f"{matrix_mins[i, j]:.4f} / {matrix_maxs[i, j]:.4f}")
                 data.append(row)
 
             headers = ["TARGET / INPUT (MIN/MAX)"] + [p.upper() for p in probes]
-            output = tabulate(data, headers=headers, tablefmt="fancy_grid")
+            output = tabulate(data, headers=headers, tablefmt="simple")
             logger.info("\n%s", output)
             logger.info("Total comparisons: %d", len(results))
 
@@ -242,8 +288,15 @@ class VoiceprintResearch:
     _VER_ENDPOINT: str = "/api/v1/private/verify"
     _STATIC_TESTS: tuple[str, ...] = ("spoof", "sick")
 
-    def __init__(self, data: Path) -> None:
+    def __init__(self, data: Path, max_concurrency: int = 32) -> None:
         self._users = self._load_registry(data)
+        # Imposters of every user, built once instead of being filtered again on each fold.
+        self._others = {
+            user.username: [u for u in self._users if u.username != user.username]
+            for user in self._users
+        }
+        # Caps in-flight enrollment and verification requests so the server is not overloaded.
+        self._sem = asyncio.Semaphore(max_concurrency)
 
     @staticmethod
     def _load_registry(data: Path) -> list[UserGroup]:
@@ -256,24 +309,26 @@ class VoiceprintResearch:
                 logger.warning("Filename does not match pattern, skipping: %s", file)
                 continue
             username = match.group("user")
-            mapping[username].append(file)
+            mapping[username].append((file, match))
 
         return [
-            UserGroup(username=username, recordings=UserRecordings.from_paths(paths))
-            for username, paths in mapping.items()
+            UserGroup(username=username, recordings=UserRecordings.from_matched(matched))
+            for username, matched in mapping.items()
         ]
 
     async def _get_score(self, client: httpx.AsyncClient, uid: str, file: Path) -> float:
-        response = await client.post(
-            f"{self._VER_ENDPOINT}/{uid}", files={"file": file.read_bytes()}
-        )
+        async with self._sem:
+            response = await client.post(
+                f"{self._VER_ENDPOINT}/{uid}", files={"file": _read_bytes(file)}
+            )
         if response.status_code not in (HTTPStatus.OK, HTTPStatus.UNAUTHORIZED):
             response.raise_for_status()
-        return float(response.json()["score"])
+        return float(orjson.loads(response.content)["score"])
 
     async def _enroll_user(self, client: httpx.AsyncClient, uid: str, files: list[Path]) -> None:
-        payload = [("files", (f.name, f.read_bytes(), "audio/wav")) for f in files]
-        response = await client.post(f"{self._ENR_ENDPOINT}/{uid}", files=payload)
+        payload = [("files", (f.name, _read_bytes(f), "audio/wav")) for f in files]
+        async with self._sem:
+            response = await client.post(f"{self._ENR_ENDPOINT}/{uid}", files=payload)
         response.raise_for_status()
 
     async def _run_dynamic_verification(
@@ -284,93 +339,134 @@ class VoiceprintResearch:
         uid: str,
         files: list[Path],
     ) -> list[ResearchResult]:
-        results = []
-        for file in files:
-            score = await self._get_score(client, uid, file)
-            results.append(
-                ResearchResult(
-                    user=user.username,
-                    probe=f"{user.username}_verification",
-                    scenario=scenario.name,
-                    duration=scenario.duration,
-                    enrollments=scenario.enrollments,
-                    type="verification",
-                    score=score,
-                )
+        scores = await asyncio.gather(*(self._get_score(client, uid, file) for file in files))
+        return [
+            ResearchResult(
+                user=user.username,
+                speaker=user.username,
+                probe=f"{user.username}_verification",
+                scenario=scenario.name,
+                duration=scenario.duration,
+                enrollments=scenario.enrollments,
+                type="verification",
+                score=score,
             )
-        return results
+            for score in scores
+        ]
 
     async def _run_static_tests(
         self, client: httpx.AsyncClient, scenario: Scenario, user: UserGroup, uid: str
     ) -> list[ResearchResult]:
+        probes = [
+            (ttype, file)
+            for ttype in self._STATIC_TESTS
+            for file in user.recordings.filter(duration=scenario.duration, type=ttype)
+        ]
+        scores = await asyncio.gather(*(self._get_score(client, uid, file) for _, file in probes))
+        return [
+            ResearchResult(
+                user=user.username,
+                speaker=user.username,
+                probe=f"{user.username}_{ttype}",
+                scenario=scenario.name,
+                duration=scenario.duration,
+                enrollments=scenario.enrollments,
+                type=ttype,
+                score=score,
+            )
+            for (ttype, _), score in zip(probes, scores, strict=True)
+        ]
+
+    async def _run_imposter_tests(
+        self,
+        client: httpx.AsyncClient,
+        scenario: Scenario,
+        user: UserGroup,
+        uid: str,
+        pools: dict[str, list[Path]],
+    ) -> list[ResearchResult]:
+        probes = [
+            (imposter, file)
+            for imposter in self._others[user.username]
+            for file in pools[imposter.username]
+        ]
+        scores = await asyncio.gather(*(self._get_score(client, uid, file) for _, file in probes))
+        return [
+            ResearchResult(
+                user=user.username,
+                speaker=imposter.username,
+                probe=f"{imposter.username}_imposter",
+                scenario=scenario.name,
+                duration=scenario.duration,
+                enrollments=scenario.enrollments,
+                type="imposter",
+                score=score,
+            )
+            for (imposter, _), score in zip(probes, scores, strict=True)
+        ]
+
+    async def _run_fold(
+        self,
+        client: httpx.AsyncClient,
+        scenario: Scenario,
+        user: UserGroup,
+        fold: int,
+        pools: dict[str, list[Path]],
+    ) -> list[ResearchResult]:
+        pool = pools[user.username]
+        available = len(pool)
+        indices = [(fold + j) % available for j in range(scenario.enrollments)]
+        uid = f"{user.id.hex}_{scenario.name}_fold{fold}"
+
+        await self._enroll_user(client, uid, [pool[idx] for idx in indices])
+
+        # Once enrolled, the verification, static and imposter probes are independent, so they
+        # are all in flight together instead of one phase waiting on the slowest probe of another.
+        verfiles = [pool[idx] for idx in range(available) if idx not in indices]
+        phases = await asyncio.gather(
+            self._run_dynamic_verification(client, scenario, user, uid, verfiles),
+            self._run_static_tests(client, scenario, user, uid),
+            self._run_imposter_tests(client, scenario, user, uid, pools),
+        )
         results = []
-        for ttype in self._STATIC_TESTS:
-            files = user.recordings.filter(duration=scenario.duration, type=ttype)
-            for file in files:
-                score = await self._get_score(client, uid, file)
-                results.append(
-                    ResearchResult(
-                        user=user.username,
-                        probe=f"{user.username}_{ttype}",
-                        scenario=scenario.name,
-                        duration=scenario.duration,
-                        enrollments=scenario.enrollments,
-                        type=ttype,
-                        score=score,
-                    )
-                )
+        for phase_results in phases:
+            results.extend(phase_results)
         return results
 
-    async def _run_imposter_tests(
-        self, client: httpx.AsyncClient, scenario: Scenario, user: UserGroup, uid: str
+    async def _run_scenario(
+        self, client: httpx.AsyncClient, scenario: Scenario
     ) -> list[ResearchResult]:
+        logger.info(
+            "> SCENARIO: %s (duration: %s, enrollments: %d)",
+            scenario.name,
+            scenario.duration,
+            scenario.enrollments,
+        )
+        # Verification pools per user, shared by the rotations and every imposter run.
+        pools = {
+            u.username: u.recordings.get_verification_pool(scenario.duration) for u in self._users
+        }
+        # Every fold enrolls its own uid, so all users and folds can run side by side.
+        folds = []
+        for user in self._users:
+            available = len(pools[user.username])
+            logger.info("Running rotation (for user: %s) on %d files", user.username, available)
+            folds.extend(self._run_fold(client, scenario, user, i, pools) for i in range(available))
+
         results = []
-        others = [u for u in self._users if u.username != user.username]
-        for imposter in others:
-            files = imposter.recordings.get_verification_pool(scenario.duration)
-            for file in files:
-                score = await self._get_score(client, uid, file)
-                results.append(
-                    ResearchResult(
-                        user=user.username,
-                        probe=f"{imposter.username}_imposter",
-                        scenario=scenario.name,
-                        duration=scenario.duration,
-                        enrollments=scenario.enrollments,
-                        type="imposter",
-                        score=score,
-                    )
-                )
+        for fold_results in await asyncio.gather(*folds):
+            results.extend(fold_results)
         return results
 
     async def run(self, client: httpx.AsyncClient) -> BatchResults:
+        # Fold uids include the scenario name, so scenarios are independent as well; the shared
+        # semaphore keeps the total number of requests in flight bounded.
         results = []
-        for sc in self._SCENARIOS:
-            logger.info(
-                "> SCENARIO: %s (duration: %s, enrollments: %d)",
-                sc.name,
-                sc.duration,
-                sc.enrollments,
-            )
-            for user in self._users:
-                pool = user.recordings.get_verification_pool(sc.duration)
-                available = len(pool)
-                logger.info("Running rotation (for user: %s) on %d files", user.username, available)
-
-                for i in range(available):
-                    indices = [(i + j) % available for j in range(sc.enrollments)]
-                    uid = f"{user.id}_{sc.name}_fold{i}".replace("-", "")
-
-                    await self._enroll_user(client, uid, [pool[idx] for idx in indices])
-                    await asyncio.sleep(0.5)
-
-                    verfiles = [pool[idx] for idx in range(available) if idx not in indices]
-                    if verfiles:
-                        results.extend(
-                            await self._run_dynamic_verification(client, sc, user, uid, verfiles)
-                        )
-                    results.extend(await self._run_static_tests(client, sc, user, uid))
-                    results.extend(await self._run_imposter_tests(client, sc, user, uid))
+        scenarios = await asyncio.gather(
+            *(self._run_scenario(client, sc) for sc in self._SCENARIOS)
+        )
+        for scenario_results in scenarios:
+            results.extend(scenario_results)
         return BatchResults(root=results)
 
 
@@ -396,12 +492,30 @@ async def main() -> None:
         help="Verification threshold for acceptance",
         default=0.7,
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="Maximum number of enrollment and verification requests in flight",
+        default=32,
+    )
+    parser.add_argument(
+        "--tablefmt",
+        type=str,
+        help="Table format of the results summary (see tabulate formats, e.g. fancy_grid)",
+        default="simple",
+    )
     args = parser.parse_args()
 
-    research = VoiceprintResearch(data=args.recordings)
-    async with httpx.AsyncClient(base_url=args.server_url, timeout=60.0) as client:
+    research = VoiceprintResearch(data=args.recordings, max_concurrency=args.concurrency)
+    # Keep a keep-alive connection per concurrent request so requests do not reconnect.
+    limits = httpx.Limits(
+        max_connections=args.concurrency,
+        max_keepalive_connections=args.concurrency,
+        keepalive_expiry=60.0,
+    )
+    async with httpx.AsyncClient(base_url=args.server_url, timeout=60.0, limits=limits) as client:
         results = await research.run(client)
-        results.summary(args.threshold)
+        results.summary(args.threshold, args.tablefmt)
 
 
 if __name__ == "__main__":